@@ -8,9 +8,13 @@ from fastapi.middleware.cors import CORSMiddleware  # ← Added
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 
 from app.routers.ai_router import router as ai_router
+from app.routers.bulk_router import router as bulk_router
 from app.routers.food_router import router as food_router
 from app.routers.meta_router import router as meta_router
+from app.routers.metrics_router import router as metrics_router
 from app.routers.rpc_router import router as rpc_router   # ← НОВО
+from app.utils.offload import loop_lag
+from app.utils.tracing import TraceMiddleware
 
 app = FastAPI(docs_url="/docs", redoc_url=None, openapi_url="/openapi.json")
 
@@ -26,15 +30,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request spans / opt-in profiling for tool execution endpoints
+# (pure ASGI, so other routes pay no per-request middleware cost)
+TRACED_PREFIXES = ("/v1/rpc", "/v1/ai")
+
+app.add_middleware(TraceMiddleware, prefixes=TRACED_PREFIXES)
+
 app.include_router(ai_router, prefix="/v1/ai")
 app.include_router(food_router, prefix="/v1/food")
 app.include_router(meta_router, prefix="/v1/mcp")
 app.include_router(rpc_router, prefix="/v1/rpc")
+app.include_router(metrics_router, prefix="/v1/metrics")
+app.include_router(bulk_router, prefix="/v1/bulk")
 
 @app.get("/", include_in_schema=False)
 async def root():
     return {"status": "ok"}
 
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    loop_lag.start()
+
 @app.on_event("startup")
 async def show_routes():
     print("\n===== ACTIVE ROUTES =====")
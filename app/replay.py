@@ -0,0 +1,108 @@
+# mcp-edamam/app/replay.py
+#
+# Replay captured traffic (see app/utils/capture.py) against a running server:
+#
+#   # server answering Edamam from the same capture:
+#   MCP_REPLAY_UPSTREAM=capture.ndjson uvicorn app.main:app --port 8000
+#
+#   python -m app.replay capture.ndjson --target http://127.0.0.1:8000 --speed 4
+#
+# Requests are sent at their recorded offsets divided by --speed
+# (--speed 0 = as fast as possible). Prints throughput, latency percentiles,
+# status counts and the server's search cache hit rate for the run.
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+def load_requests(path: str) -> List[Dict[str, Any]]:
+    """Recorded requests in time order (lines from several workers may interleave)."""
+    with open(path, encoding="utf-8") as fh:
+        records = [json.loads(line) for line in fh if line.strip()]
+    requests = [r for r in records if r.get("kind") == "request"]
+    requests.sort(key=lambda r: r["t"])
+    return requests
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+
+async def _cache_stats(client: httpx.AsyncClient) -> Optional[Dict[str, Any]]:
+    try:
+        resp = await client.get("/v1/metrics/upstream")
+        return resp.json().get("search_cache")
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def replay(requests: List[Dict[str, Any]], target: str, speed: float, timeout: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+
+    async with httpx.AsyncClient(base_url=target, timeout=timeout) as client:
+        before = await _cache_stats(client)
+
+        async def send(record):
+            start = time.perf_counter()
+            try:
+                resp = await client.post(record["path"], json=record["body"])
+                statuses[resp.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+        origin = requests[0]["t"] if requests else 0.0
+        started = time.perf_counter()
+        tasks = []
+        for record in requests:
+            if speed > 0:
+                delay = (record["t"] - origin) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(record)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        after = await _cache_stats(client)
+
+    report: Dict[str, Any] = {
+        "requests": len(requests),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(requests) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            f"p{p}": round(_percentile(latencies, p) * 1000, 1) for p in (50, 95, 99)
+        },
+        "status": {str(k): v for k, v in statuses.items()},
+    }
+    if before is not None and after is not None:
+        hits = after["hits"] - before["hits"]
+        lookups = hits + after["misses"] - before["misses"]
+        report["search_cache_hit_rate"] = round(hits / lookups, 4) if lookups else None
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Replay captured MCP traffic.")
+    parser.add_argument("capture", help="NDJSON file written with MCP_CAPTURE_FILE")
+    parser.add_argument("--target", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help="N× recorded speed; 0 = no pacing")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    requests = load_requests(args.capture)
+    report = asyncio.run(replay(requests, args.target, args.speed, args.timeout))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
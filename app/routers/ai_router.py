@@ -1,11 +1,17 @@
 # mcp-edamam/app/routers/ai_router.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 import logging
 from typing import Optional
-from app.services.edamam_service import search_food, get_food_nutrition, get_nutrition_from_image
+from app.services.edamam_service import search_food, get_food_nutrition_record, get_nutrition_from_image
+from app.services.admission import OverloadedError, admission, classify_tool
+from app.services.concurrency import UpstreamBusyError
+from app.services.query_canonicalizer import canonicalize_query
+from app.utils.capture import recorder
 from app.utils.logger import mcp_logger
+from app.utils.offload import InvalidImageError
+from app.utils.request_body import body_schema, read_model
 
 router = APIRouter(
     tags=["AI"]
@@ -134,10 +140,28 @@ class AIQuery(BaseModel):
         },
         400: {"description": "Invalid intent or missing parameters"},
         404: {"description": "Food not found"},
-        500: {"description": "Internal MCP error"}
-    }
+        500: {"description": "Internal MCP error"},
+        503: {"description": "Server busy (admission control) or Edamam upstream queue is full"}
+    },
+    openapi_extra=body_schema(AIQuery),
 )
-async def ai_query(payload: AIQuery):
+async def ai_query(request: Request):
+    # Parsed off the event loop when large (base64 images), see request_body.py
+    payload = await read_model(request, AIQuery)
+    recorder.record_request(request.url.path, payload.model_dump())
+
+    try:
+        async with admission.admit(classify_tool(payload.intent, payload.parameters)):
+            return await _run_intent(payload)
+    except OverloadedError as e:
+        mcp_logger.error(f"[MCP BUSY] {e} for intent={payload.intent}")
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+async def _run_intent(payload: AIQuery):
+    """Execute one intent (already recorded and admitted by the route)."""
     mcp_logger.info(f"[LLM→MCP] Intent: {payload.intent}, Parameters: {payload.parameters}")
     mcp_logger.info(f"AI request: {payload.dict()}")
 
@@ -149,23 +173,27 @@ async def ai_query(payload: AIQuery):
         # ======================================================
         if payload.intent == "get_food_nutrition":
             query = payload.parameters.get("query")
-            quantity = payload.parameters.get("quantity", 100)
+            quantity = payload.parameters.get("quantity")
 
             # Image URL auto-redirect
             if isinstance(query, str) and any(ext in query.lower() for ext in [".jpg", ".jpeg", ".png", ".webp"]):
                 mcp_logger.info("[MCP] Auto-redirect text query → analyze_food_image")
-                return await ai_query(AIQuery(intent="analyze_food_image", parameters={"image_url": query}))
+                return await _run_intent(AIQuery(intent="analyze_food_image", parameters={"image_url": query}))
+
+            # "banana 150g" → quantity=150 unless given explicitly
+            if quantity is None:
+                quantity = (isinstance(query, str) and canonicalize_query(query).grams) or 100
 
             # UPC / EAN / PLU / normal text: handled inside search_food()
             food = await search_food(query)
             if not food:
                 raise HTTPException(status_code=404, detail="Food not found")
 
-            nutrition = await get_food_nutrition(food["foodId"], quantity)
+            nutrition = await get_food_nutrition_record(food["foodId"], quantity)
             result = {
                 "food": food["label"],
                 "quantity": quantity,
-                "nutrients": nutrition.get("totalNutrients", {})
+                "nutrients": nutrition.to_dict()
             }
 
         # ======================================================
@@ -237,6 +265,14 @@ async def ai_query(payload: AIQuery):
         mcp_logger.error(f"[MCP ERROR] {e.detail} for intent={payload.intent}")
         raise e
 
+    except UpstreamBusyError as e:
+        mcp_logger.error(f"[MCP BUSY] {e} for intent={payload.intent}")
+        raise HTTPException(status_code=503, detail=str(e))
+
+    except InvalidImageError as e:
+        mcp_logger.error(f"[MCP ERROR] {e} for intent={payload.intent}")
+        raise HTTPException(status_code=400, detail=str(e))
+
     except Exception as e:
         mcp_logger.exception(f"[MCP ERROR] Exception for intent={payload.intent}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,122 @@
+# mcp-edamam/app/routers/bulk_router.py
+
+import asyncio
+import json
+import os
+import time
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+
+from app.services.bulk_service import BulkJob, active_jobs, iter_rows, recent_jobs
+
+router = APIRouter(
+    tags=["Bulk"]
+)
+
+BULK_CONCURRENCY = int(os.getenv("MCP_BULK_CONCURRENCY", "16"))
+# Seconds between {"progress": ...} lines in the result stream
+PROGRESS_INTERVAL = float(os.getenv("MCP_BULK_PROGRESS_INTERVAL", "5"))
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that streams results while the endpoint is still reading
+    the upload from `receive`. Until `input_done` is set, a disconnect shows up
+    in the upload stream (ClientDisconnect); after it, `receive` is watched for
+    `http.disconnect` and the stream (and the job behind it) is cancelled.
+    Servers that drop sends to a closed connection silently (uvicorn) would
+    otherwise keep the job running to the end.
+    """
+
+    def __init__(self, content, input_done: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.input_done = input_done
+
+    async def _wait_disconnect(self, receive) -> None:
+        await self.input_done.wait()
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def __call__(self, scope, receive, send):
+        stream = asyncio.ensure_future(self.stream_response(send))
+        watcher = asyncio.ensure_future(self._wait_disconnect(receive))
+        try:
+            await asyncio.wait((stream, watcher), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+            if not stream.done():
+                stream.cancel()
+                await asyncio.gather(stream, return_exceptions=True)
+        if stream.cancelled():
+            return
+        try:
+            stream.result()
+        except OSError:
+            raise ClientDisconnect()
+
+
+def _line(obj) -> bytes:
+    return (json.dumps(obj, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def _read_upload(receive, done: asyncio.Event):
+    """request.stream(), but sets `done` as soon as the last body message arrives."""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnect()
+        more = message.get("more_body", False)
+        if not more:
+            done.set()
+        if message.get("body"):
+            yield message["body"]
+        if not more:
+            return
+
+
+async def _stream_results(job: BulkJob, rows):
+    last_progress = time.monotonic()
+    async for result in job.run(rows):
+        yield _line(result)
+        if time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+            last_progress = time.monotonic()
+            yield _line({"progress": job.stats()})
+    yield _line({"summary": job.stats()})
+
+
+@router.post(
+    "/food-log",
+    summary="Bulk nutrition for food-log rows (streamed NDJSON)",
+    description=(
+        "Upload CSV (`Content-Type: text/csv`, header row required) or NDJSON rows with "
+        "`query`, `upc` or `foodId` and optional `quantity` (grams). Rows are processed "
+        "concurrently and results are streamed back as NDJSON in completion order, "
+        "each tagged with its `row` index. Progress lines (`{\"progress\": ...}`) are "
+        "interleaved periodically and a final `{\"summary\": ...}` line closes the stream."
+    ),
+    response_class=DuplexStreamingResponse,
+)
+async def bulk_food_log(request: Request):
+    fmt = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    job = BulkJob(concurrency=BULK_CONCURRENCY)
+    input_done = asyncio.Event()
+    rows = iter_rows(_read_upload(request.receive, input_done), fmt)
+    return DuplexStreamingResponse(
+        _stream_results(job, rows),
+        input_done=input_done,
+        media_type="application/x-ndjson",
+        headers={"X-MCP-Job-Id": job.id},
+    )
+
+
+@router.get(
+    "/jobs",
+    summary="Bulk job progress",
+    description="Counters for running bulk jobs and the most recently finished ones."
+)
+async def bulk_jobs():
+    return {
+        "active": [job.stats() for job in active_jobs.values()],
+        "recent": list(reversed(recent_jobs)),
+    }
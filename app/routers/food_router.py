@@ -1,27 +1,43 @@
 # mcp-edamam/app/routers/food_router.py
 
-from fastapi import APIRouter, Query, HTTPException
+import os
+from fastapi import APIRouter, Query, HTTPException, Request
 from pydantic import BaseModel
+from app.services.concurrency import UpstreamBusyError
 from app.services.edamam_service import search_food, get_nutrition_from_image
+from app.utils.http_cache import cacheable_json
+from app.utils.offload import InvalidImageError
+from app.utils.request_body import body_schema, read_model
 
 router = APIRouter(
     tags=["Food"]
 )
 
+SEARCH_MAX_AGE = int(os.getenv("MCP_CACHE_MAX_AGE_SEARCH", "3600"))
+
 class ImageRequest(BaseModel):
     image: str  # URL или base64 data URI
 
 @router.get("/search")
-async def food_search(q: str = Query(..., description="Food to search for")):
-    result = await search_food(q)
+async def food_search(request: Request, q: str = Query(..., description="Food to search for")):
+    try:
+        result = await search_food(q)
+    except UpstreamBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     if not result:
         raise HTTPException(status_code=404, detail="Food not found")
-    return result
+    return cacheable_json(request, result, SEARCH_MAX_AGE)
 
-@router.post("/analyze-image")
-async def analyze_image(payload: ImageRequest):
+@router.post("/analyze-image", openapi_extra=body_schema(ImageRequest))
+async def analyze_image(request: Request):
+    # Parsed off the event loop when large (base64 images), see request_body.py
+    payload = await read_model(request, ImageRequest)
     try:
         result = await get_nutrition_from_image(payload.image)
         return result
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
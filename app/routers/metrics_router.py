@@ -0,0 +1,60 @@
+# mcp-edamam/app/routers/metrics_router.py
+
+from fastapi import APIRouter
+from app.services.admission import admission
+from app.services.edamam_service import search_cache, upstream_hedgers, upstream_limiters
+from app.utils.offload import loop_lag
+from app.utils.tracing import SLOW_REQUEST_SECONDS, slow_requests
+
+router = APIRouter(
+    tags=["Metrics"]
+)
+
+
+@router.get(
+    "/upstream",
+    summary="Upstream concurrency and cache state",
+    description=(
+        "Current adaptive limit, in-flight calls, queue depth and rejections per Edamam endpoint, "
+        "plus hedging and search cache counters."
+    )
+)
+async def upstream_metrics():
+    return {
+        "endpoints": {name: lim.stats() for name, lim in upstream_limiters.items()},
+        "hedging": {name: h.stats() for name, h in upstream_hedgers.items()},
+        "search_cache": search_cache.stats(),
+    }
+
+
+@router.get(
+    "/slow-requests",
+    summary="Recent slow requests",
+    description=(
+        "Most recent requests slower than MCP_SLOW_REQUEST_MS, newest first, "
+        "with their span breakdown and profile file paths (if profiled)."
+    )
+)
+async def slow_request_metrics(limit: int = 20):
+    return {
+        "threshold_ms": SLOW_REQUEST_SECONDS * 1000,
+        "requests": list(reversed(slow_requests))[:limit],
+    }
+
+
+@router.get(
+    "/event-loop",
+    summary="Event-loop lag",
+    description="How late the event loop wakes up (p50/p99/max), plus the CPU offload pool settings."
+)
+async def event_loop_metrics():
+    return loop_lag.stats()
+
+
+@router.get(
+    "/admission",
+    summary="Admission control state",
+    description="Per cost class: concurrency, in-flight, queue depth, estimated wait, admitted and shed counts."
+)
+async def admission_metrics():
+    return admission.stats()
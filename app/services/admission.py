@@ -0,0 +1,175 @@
+# mcp-edamam/app/services/admission.py
+#
+# Admission control with per-tool cost classes:
+#
+#   metadata < search < nutrition < image
+#
+# Each class has its own concurrency and queue limit. A request is shed up
+# front (OverloadedError → HTTP 503 + Retry-After, or a JSON-RPC busy error)
+# when its queue is full or its estimated queue wait exceeds the class
+# target. Control-plane methods (initialize, tools/list, ...) are never
+# classified, so they bypass admission entirely and stay responsive.
+#
+# Limits per class: MCP_ADMISSION_<CLASS>="concurrency,queue,target_wait_s",
+# e.g. MCP_ADMISSION_IMAGE=4,16,10. MCP_ADMISSION=0 disables admission control.
+
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+ADMISSION_ENABLED = os.getenv("MCP_ADMISSION", "1").lower() not in ("0", "false", "no")
+
+# name → (concurrency, max_queue, target_wait_seconds)
+DEFAULT_CLASSES = {
+    "metadata": (64, 256, 1.0),
+    "search": (32, 128, 2.0),
+    "nutrition": (16, 64, 3.0),
+    "image": (4, 16, 10.0),
+}
+
+TOOL_CLASSES = {
+    "get_mcp_schema": "metadata",
+    "search_food": "search",
+    "get_food_nutrition": "nutrition",
+    "analyze_food_image": "image",
+    "get_nutrition_from_image": "image",
+}
+
+_IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+class OverloadedError(RuntimeError):
+    """Request shed by admission control; retry after `retry_after` seconds."""
+
+    def __init__(self, cost_class: str, retry_after: int, reason: str):
+        super().__init__(f"Server busy ({cost_class}: {reason}), retry after {retry_after}s")
+        self.cost_class = cost_class
+        self.retry_after = retry_after
+
+
+def classify_tool(name: Any, args: Any = None) -> str:
+    """Cost class of a tool / REST intent. Malformed input is "metadata" (it fails fast)."""
+    if not isinstance(name, str):
+        return "metadata"
+    query = args.get("query") if isinstance(args, dict) else None
+    # get_food_nutrition with an image URL is redirected to image analysis
+    if name == "get_food_nutrition" and isinstance(query, str) and any(ext in query.lower() for ext in _IMAGE_EXTS):
+        return "image"
+    return TOOL_CLASSES.get(name, "metadata")
+
+
+def classify_method(method: str, params: Any) -> Optional[str]:
+    """Cost class of a JSON-RPC method; None for control-plane methods."""
+    params = params if isinstance(params, dict) else {}
+    if method == "tools/call":
+        return classify_tool(params.get("name"), params.get("arguments"))
+    if method in TOOL_CLASSES:
+        return classify_tool(method, params)
+    return None
+
+
+class CostClass:
+    def __init__(self, name: str, concurrency: int, max_queue: int, target_wait: float, smoothing: float = 0.1):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.target_wait = target_wait
+        self.smoothing = smoothing
+
+        self._slots = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.service_time: Optional[float] = None
+
+    def estimated_wait(self) -> float:
+        """Expected queue wait for a newcomer: (waiters ahead + 1) / concurrency × service time."""
+        if self.in_flight < self.concurrency or self.service_time is None:
+            return 0.0
+        return (self.waiting + 1) / self.concurrency * self.service_time
+
+    def _reject(self, reason: str, wait: float) -> OverloadedError:
+        self.shed += 1
+        retry_after = max(1, math.ceil(wait or self.target_wait))
+        return OverloadedError(self.name, retry_after, reason)
+
+    @asynccontextmanager
+    async def admit(self):
+        wait = self.estimated_wait()
+        if self.in_flight >= self.concurrency:
+            if self.waiting >= self.max_queue:
+                raise self._reject("queue full", wait)
+            if wait > self.target_wait:
+                raise self._reject(f"estimated wait {wait:.1f}s", wait)
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            if self.service_time is None:
+                self.service_time = elapsed
+            else:
+                self.service_time += (elapsed - self.service_time) * self.smoothing
+            self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "target_wait_s": self.target_wait,
+            "estimated_wait_s": round(self.estimated_wait(), 3),
+            "avg_service_ms": round(self.service_time * 1000, 1) if self.service_time else None,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+def _load_class(name: str, defaults) -> CostClass:
+    raw = os.getenv(f"MCP_ADMISSION_{name.upper()}")
+    concurrency, max_queue, target = defaults
+    if raw:
+        parts = [p.strip() for p in raw.split(",")]
+        concurrency = int(parts[0])
+        max_queue = int(parts[1]) if len(parts) > 1 else max_queue
+        target = float(parts[2]) if len(parts) > 2 else target
+    return CostClass(name, concurrency, max_queue, target)
+
+
+class AdmissionController:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.classes = {name: _load_class(name, d) for name, d in DEFAULT_CLASSES.items()}
+
+    @asynccontextmanager
+    async def admit(self, cost_class: Optional[str]):
+        """Hold a slot of `cost_class` (None = control plane, always admitted)."""
+        if not self.enabled or cost_class is None:
+            yield
+            return
+        async with self.classes[cost_class].admit():
+            yield
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "classes": {name: c.stats() for name, c in self.classes.items()},
+        }
+
+
+admission = AdmissionController(ADMISSION_ENABLED)
@@ -0,0 +1,218 @@
+# mcp-edamam/app/services/bulk_service.py
+#
+# Bulk food-log processing: rows of {query | upc | foodId, quantity} in,
+# one result per row out (in completion order). Rows are read lazily and
+# processed with bounded concurrency; repeated foods within a job share a
+# single search / nutrients lookup (only distinct foods are held in memory).
+
+import asyncio
+import csv
+import json
+import time
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from app.services.edamam_service import get_food_nutrition_record, search_food_record
+from app.services.query_canonicalizer import canonicalize_query
+
+# Finished jobs kept for GET /v1/bulk/jobs
+recent_jobs: deque = deque(maxlen=20)
+active_jobs: Dict[str, "BulkJob"] = {}
+
+# Nutrients are fetched once per food at this many grams and scaled per row
+BASE_GRAMS = 100.0
+
+
+# =====================================================================
+# INPUT PARSING
+# =====================================================================
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    buffer = b""
+    first = True
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            text = line.decode("utf-8").strip()
+            if first:
+                text, first = text.lstrip("\ufeff"), False
+            if text:
+                yield text
+    text = buffer.decode("utf-8").strip()
+    if first:
+        text = text.lstrip("\ufeff")
+    if text:
+        yield text
+
+
+async def iter_rows(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Dict[str, Any]]:
+    """Parse a streamed upload. `fmt` is "csv" (header row required) or "ndjson"."""
+    header = None
+    async for line in _iter_lines(chunks):
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            yield {k: v.strip() for k, v in zip(header, values) if v.strip()}
+        else:
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield {"_error": f"Invalid JSON: {e}", "_raw": line}
+                continue
+            yield row if isinstance(row, dict) else {"_error": "Row must be a JSON object", "_raw": line}
+
+
+# =====================================================================
+# JOB
+# =====================================================================
+
+def _row_error(exc: Exception) -> str:
+    """Client-safe error text (httpx messages include the URL with app_id/app_key)."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return f"Edamam returned HTTP {exc.response.status_code}"
+    if isinstance(exc, httpx.RequestError):
+        return f"Edamam request failed ({type(exc).__name__})"
+    return str(exc)
+
+
+class BulkJob:
+    def __init__(self, concurrency: int = 16):
+        self.id = uuid.uuid4().hex[:12]
+        self.concurrency = concurrency
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+        self.rows_read = 0
+        self.rows_done = 0
+        self.rows_failed = 0
+        self.lookups = 0
+        self.deduplicated = 0
+
+        # Shared lookups: repeated foods await the same task (results are
+        # compact FoodRecord / NutritionRecord objects, see records.py).
+        # Nutrients are keyed by food only: gram quantities scale linearly.
+        self._foods: Dict[str, asyncio.Task] = {}
+        self._nutrition: Dict[str, asyncio.Task] = {}
+
+    def _shared(self, table: Dict, key, factory) -> asyncio.Task:
+        task = table.get(key)
+        if task is None:
+            self.lookups += 1
+            task = table[key] = asyncio.ensure_future(factory())
+
+            def evict_failed(t, key=key):
+                # A transient error must not fail later rows for the same food
+                if (t.cancelled() or t.exception() is not None) and table.get(key) is t:
+                    del table[key]
+
+            task.add_done_callback(evict_failed)
+        else:
+            self.deduplicated += 1
+        return task
+
+    async def _process(self, index: int, row: Dict[str, Any]) -> Dict[str, Any]:
+        if "_error" in row:
+            raise ValueError(row["_error"])
+
+        query = row.get("query") or row.get("upc")
+        food_id = row.get("foodId")
+        quantity = row.get("quantity")
+        if quantity in (None, "") and query:
+            quantity = canonicalize_query(str(query)).grams
+        quantity = float(quantity or 100)
+
+        label = None
+        if not food_id:
+            if not query:
+                raise ValueError("Row needs 'query', 'upc' or 'foodId'")
+            key = canonicalize_query(str(query)).text
+            food = await self._shared(self._foods, key, lambda: search_food_record(str(query)))
+            if not food:
+                raise ValueError("Food not found")
+            food_id, label = food.food_id, food.label
+
+        nutrition = await self._shared(
+            self._nutrition, food_id, lambda: get_food_nutrition_record(food_id, BASE_GRAMS)
+        )
+        return {
+            "row": index,
+            "foodId": food_id,
+            "food": label,
+            "quantity": quantity,
+            "nutrients": nutrition.scaled(quantity / BASE_GRAMS).to_dict(),
+        }
+
+    async def _run_row(self, index: int, row: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            result = await self._process(index, row)
+        except Exception as e:
+            self.rows_failed += 1
+            result = {"row": index, "input": row.get("_raw", row), "error": _row_error(e)}
+        self.rows_done += 1
+        return result
+
+    async def run(self, rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield row results as they finish; input is only read as slots free up."""
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        done = object()
+
+        async def worker(index, row):
+            try:
+                await results.put(await self._run_row(index, row))
+            finally:
+                slots.release()
+
+        async def feed():
+            try:
+                async for row in rows:
+                    await slots.acquire()
+                    task = asyncio.create_task(worker(self.rows_read, row))
+                    self.rows_read += 1
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if tasks:
+                    await asyncio.gather(*tasks)
+            finally:
+                await results.put(done)
+
+        active_jobs[self.id] = self
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                item = await results.get()
+                if item is done:
+                    break
+                yield item
+            try:
+                await feeder
+            except Exception as e:
+                yield {"error": f"Upload aborted after {self.rows_read} rows: {e}"}
+        finally:
+            for task in (feeder, *tasks, *self._foods.values(), *self._nutrition.values()):
+                if not task.done():
+                    task.cancel()
+            self.finished = time.monotonic()
+            active_jobs.pop(self.id, None)
+            recent_jobs.append(self.stats())
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return {
+            "job_id": self.id,
+            "status": "finished" if self.finished else "running",
+            "rows_read": self.rows_read,
+            "rows_done": self.rows_done,
+            "rows_failed": self.rows_failed,
+            "upstream_lookups": self.lookups,
+            "deduplicated_lookups": self.deduplicated,
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round(self.rows_done / elapsed, 2) if elapsed else None,
+        }
@@ -0,0 +1,161 @@
+# mcp-edamam/app/services/concurrency.py
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+
+class UpstreamBusyError(RuntimeError):
+    """Raised when the wait queue for an upstream endpoint is full or too slow."""
+
+
+def _is_overload(exc: BaseException) -> bool:
+    """Timeouts, 429 and 5xx mean Edamam is struggling → back off."""
+    if isinstance(exc, httpx.TimeoutException):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return False
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one upstream endpoint.
+
+    - success with healthy latency → limit grows by ~1 per window (+1/limit per call)
+    - latency above `tolerance` × smoothed latency, timeout, 429 or 5xx
+      → limit is multiplied by `backoff` (at most once per smoothed latency)
+    - callers over the limit wait in a bounded FIFO queue
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        max_queue: int = 64,
+        queue_timeout: float = 10.0,
+        tolerance: float = 2.0,
+        backoff: float = 0.5,
+        smoothing: float = 0.05,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._latency: Optional[float] = None
+        self._last_drop = 0.0
+
+        self.in_flight = 0
+        self.rejected = 0
+        self.drops = 0
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for f in self._waiters if not f.done())
+
+    # -----------------------------------------------------------------
+    # Slot accounting
+    # -----------------------------------------------------------------
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            fut = self._waiters.popleft()
+            if fut.done():
+                continue
+            self.in_flight += 1
+            fut.set_result(None)
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    async def _acquire(self) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise UpstreamBusyError(f"Edamam {self.name} queue is full")
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                # Slot was handed over just as we gave up — pass it on
+                self._release()
+            else:
+                fut.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise UpstreamBusyError(f"Edamam {self.name} queue wait timed out") from None
+            raise
+
+    # -----------------------------------------------------------------
+    # AIMD
+    # -----------------------------------------------------------------
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_drop < (self._latency or 0.0):
+            return
+        self._last_drop = now
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+        self.drops += 1
+
+    def _record_latency(self, latency: float) -> None:
+        if self._latency is None:
+            self._latency = latency
+
+        if latency > self._latency * self.tolerance:
+            self._decrease()
+        else:
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+
+        self._latency += (latency - self._latency) * self.smoothing
+
+    @asynccontextmanager
+    async def slot(self):
+        await self._acquire()
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            if _is_overload(e):
+                self._decrease()
+            raise
+        else:
+            self._record_latency(time.monotonic() - start)
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "limit_drops": self.drops,
+            "smoothed_latency_ms": round(self._latency * 1000, 1) if self._latency else None,
+        }
@@ -1,13 +1,92 @@
 # mcp-edamam/app/services/edamam_service.py
 
 import os
+import time
 import httpx
+from app.services.cache import TTLCache
+from app.services.concurrency import AdaptiveLimiter
+from app.services.hedging import Hedger
+from app.services.query_canonicalizer import canonicalize_query
+from app.services.records import NutritionRecord, food_from_parser
+from app.utils.capture import make_upstream_transport, recorder
 from app.utils.logger import mcp_logger
+from app.utils.offload import check_data_uri, encode_image_request, parse_json
+from app.utils.tracing import span, traced
 
 FOOD_SEARCH_URL = "https://api.edamam.com/api/food-database/v2/parser"
 NUTRIENTS_URL = "https://api.edamam.com/api/food-database/v2/nutrients"
 NUTRIENTS_FROM_IMAGE_URL = "https://api.edamam.com/api/food-database/v2/nutrients-from-image"
 
+# None = real network; a ReplayTransport when MCP_REPLAY_UPSTREAM is set
+upstream_transport = make_upstream_transport()
+
+# Parser results (FoodRecord) keyed by canonical query (see query_canonicalizer.py)
+search_cache = TTLCache(
+    maxsize=int(os.getenv("EDAMAM_SEARCH_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("EDAMAM_SEARCH_CACHE_TTL", "3600")),
+)
+
+
+def _make_limiter(name: str) -> AdaptiveLimiter:
+    return AdaptiveLimiter(
+        name,
+        initial=int(os.getenv("EDAMAM_CONCURRENCY_INITIAL", "8")),
+        min_limit=int(os.getenv("EDAMAM_CONCURRENCY_MIN", "1")),
+        max_limit=int(os.getenv("EDAMAM_CONCURRENCY_MAX", "64")),
+        max_queue=int(os.getenv("EDAMAM_QUEUE_SIZE", "64")),
+        queue_timeout=float(os.getenv("EDAMAM_QUEUE_TIMEOUT", "10")),
+    )
+
+
+# Adaptive (AIMD) in-flight limit per Edamam endpoint
+upstream_limiters = {
+    "parser": _make_limiter("parser"),
+    "nutrients": _make_limiter("nutrients"),
+    "image": _make_limiter("image"),
+}
+
+
+def _make_hedger(name: str) -> Hedger:
+    return Hedger(
+        name,
+        enabled=os.getenv("EDAMAM_HEDGING", "0").lower() in ("1", "true", "yes"),
+        percentile=float(os.getenv("EDAMAM_HEDGE_PERCENTILE", "95")),
+        max_ratio=float(os.getenv("EDAMAM_HEDGE_MAX_RATIO", "0.05")),
+        limiter=upstream_limiters[name],
+    )
+
+
+# Optional hedging for idempotent lookups only (never for image analysis)
+upstream_hedgers = {
+    "parser": _make_hedger("parser"),
+    "nutrients": _make_hedger("nutrients"),
+}
+
+
+async def _send(endpoint: str, client: httpx.AsyncClient, method: str, url: str, **kwargs):
+    """One upstream attempt, counted against the endpoint's concurrency limit."""
+    with span(f"edamam:{endpoint}", method=method):
+        return await _send_once(endpoint, client, method, url, **kwargs)
+
+
+async def _send_once(endpoint: str, client: httpx.AsyncClient, method: str, url: str, **kwargs):
+    async with upstream_limiters[endpoint].slot():
+        # Upstream time only (queueing for the slot is excluded)
+        start = time.monotonic()
+        resp = await client.request(method, url, **kwargs)
+        latency = time.monotonic() - start
+        recorder.record_upstream(resp, latency)
+        # Decode only the logged prefix, not a possibly multi-MB body
+        mcp_logger.info(
+            f"[Edamam→MCP] Status: {resp.status_code}, "
+            f"Response: {resp.content[:400].decode('utf-8', 'replace')}"
+        )
+
+        resp.raise_for_status()
+    if endpoint in upstream_hedgers:
+        upstream_hedgers[endpoint].record(latency)
+    return resp
+
 
 def _is_upc(query: str) -> bool:
     """
@@ -19,13 +98,22 @@ def _is_upc(query: str) -> bool:
     return query.isdigit() and 8 <= len(query) <= 14
 
 
+@traced("service.get_nutrition_from_image")
 async def get_nutrition_from_image(image: str):
     app_id = os.getenv("EDAMAM_APP_ID")
     app_key = os.getenv("EDAMAM_APP_KEY")
     if not app_id or not app_key:
         raise ValueError("EDAMAM_APP_ID or EDAMAM_APP_KEY not set in environment")
 
-    payload = {"image_url": image}
+    # Base64 data URIs: validate + hash (in the offload pool when large)
+    if image.startswith("data:"):
+        info = await check_data_uri(image)
+        image_desc = f"data URI {info['mime']}, {info['bytes']} bytes, sha256={info['sha256'][:16]}"
+    else:
+        image_desc = image[:100]
+
+    # Encoding a multi-MB data URI is as costly as decoding it: off the loop too
+    payload = await encode_image_request(image)
 
     params = {
         "app_id": app_id,
@@ -33,23 +121,40 @@ async def get_nutrition_from_image(image: str):
         "beta": "true",
     }
 
-    mcp_logger.info(f"[MCP→Edamam] Nutrients-from-image: {image[:100]}")
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        resp = await client.post(NUTRIENTS_FROM_IMAGE_URL, params=params, json=payload)
-        mcp_logger.info(
-            f"[Edamam→MCP] Status: {resp.status_code}, Response: {resp.text[:400]}"
+    mcp_logger.info(f"[MCP→Edamam] Nutrients-from-image: {image_desc}")
+    async with httpx.AsyncClient(timeout=20.0, transport=upstream_transport) as client:
+        resp = await _send(
+            "image", client, "POST", NUTRIENTS_FROM_IMAGE_URL,
+            params=params, content=payload, headers={"Content-Type": "application/json"},
         )
-
-        resp.raise_for_status()
-        return resp.json()
+        return await parse_json(resp.content)
 
 
 async def search_food(query: str):
+    """Top parser match as a response dict, or None."""
+    record = await search_food_record(query)
+    return record.to_dict() if record else None
+
+
+@traced("service.search_food")
+async def search_food_record(query: str):
+    """Top parser match as a compact FoodRecord (what the search cache holds), or None."""
     app_id = os.getenv("EDAMAM_APP_ID")
     app_key = os.getenv("EDAMAM_APP_KEY")
     if not app_id or not app_key:
         raise ValueError("EDAMAM_APP_ID or EDAMAM_APP_KEY not set in environment")
 
+    # "Bananas", "banana 100g", "1 banana" share the cache key "banana";
+    # Edamam still gets the user's wording, minus the quantity
+    mcp_logger.info(f"[MCP] Search query: '{query}'")
+    canonical = canonicalize_query(query)
+    key, query = canonical.text, canonical.lookup
+
+    cached = search_cache.get(key)
+    if cached is not None:
+        mcp_logger.info(f"[MCP cache] Hit: '{key}'")
+        return cached
+
     # -----------------------------------------------
     # NEW: UPC DETECTION & PROPER EDAMAM ROUTING
     # -----------------------------------------------
@@ -69,34 +174,22 @@ async def search_food(query: str):
         }
         mcp_logger.info(f"[MCP→Edamam] Search food: '{query}'")
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(FOOD_SEARCH_URL, params=params)
-        mcp_logger.info(
-            f"[Edamam→MCP] Status: {resp.status_code}, Response: {resp.text[:400]}"
+    async with httpx.AsyncClient(timeout=10.0, transport=upstream_transport) as client:
+        resp = await upstream_hedgers["parser"].run(
+            lambda: _send("parser", client, "GET", FOOD_SEARCH_URL, params=params)
         )
-
-        resp.raise_for_status()
-        data = resp.json()
-
-        food = None
-        if data.get("parsed"):
-            food = data["parsed"][0]["food"]
-        elif data.get("hints"):
-            food = data["hints"][0]["food"]
-
-        if not food:
+        # Parsed and reduced to the top match in one step (off the loop when large)
+        record = await parse_json(resp.content, food_from_parser)
+        if record is None:
             return None
 
-        return {
-            "foodId": food.get("foodId"),
-            "label": food.get("label"),
-            "category": food.get("category"),
-            "nutrients": food.get("nutrients"),
-            "image": food.get("image"),
-        }
+        search_cache.set(key, record)
+        return record
 
 
-async def get_food_nutrition(food_id: str, quantity: float):
+@traced("service.get_food_nutrition")
+async def get_food_nutrition(food_id: str, quantity: float, reducer=None):
+    """Nutrients response for food_id/quantity, or `reducer(response)` (see parse_json)."""
     app_id = os.getenv("EDAMAM_APP_ID")
     app_key = os.getenv("EDAMAM_APP_KEY")
     if not app_id or not app_key:
@@ -113,14 +206,17 @@ async def get_food_nutrition(food_id: str, quantity: float):
     }
 
     mcp_logger.info(f"[MCP→Edamam] Nutrients for foodId={food_id}, quantity={quantity}")
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.post(
-            f"{NUTRIENTS_URL}?app_id={app_id}&app_key={app_key}",
-            json=payload,
-        )
-        mcp_logger.info(
-            f"[Edamam→MCP] Status: {resp.status_code}, Response: {resp.text[:400]}"
+    async with httpx.AsyncClient(timeout=10.0, transport=upstream_transport) as client:
+        resp = await upstream_hedgers["nutrients"].run(
+            lambda: _send(
+                "nutrients", client, "POST",
+                f"{NUTRIENTS_URL}?app_id={app_id}&app_key={app_key}",
+                json=payload,
+            )
         )
+        return await parse_json(resp.content, reducer)
 
-        resp.raise_for_status()
-        return resp.json()
+
+async def get_food_nutrition_record(food_id: str, quantity: float) -> NutritionRecord:
+    """`totalNutrients` for food_id/quantity as a compact NutritionRecord."""
+    return await get_food_nutrition(food_id, quantity, NutritionRecord.from_edamam)
@@ -0,0 +1,131 @@
+# mcp-edamam/app/services/hedging.py
+
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.utils.logger import mcp_logger
+
+
+class LatencyTracker:
+    """Rolling window of recent successful-call latencies (seconds)."""
+
+    def __init__(self, window: int = 500):
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, int(len(ordered) * pct / 100.0))
+        return ordered[idx]
+
+
+class Hedger:
+    """
+    Hedged requests for idempotent upstream calls.
+
+    If the first attempt has not answered within the tracked `percentile`
+    latency, an identical second attempt is started; the first successful
+    response wins and the other is cancelled. Hedges draw from a token
+    budget refilled by `max_ratio` per request, so they never exceed that
+    share of traffic.
+
+    Latencies are fed in by the caller via `record()` and should be upstream
+    time only (not time queued for a concurrency slot). No hedge is sent
+    while `limiter` has callers waiting for a slot.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        enabled: bool = False,
+        percentile: float = 95.0,
+        max_ratio: float = 0.05,
+        min_samples: int = 20,
+        max_tokens: float = 10.0,
+        limiter=None,
+    ):
+        self.name = name
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.max_tokens = max_tokens
+        self.limiter = limiter
+
+        self.latency = LatencyTracker()
+        self._tokens = 0.0
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped_busy = 0
+
+    def record(self, latency: float) -> None:
+        """Latency of one successful upstream call (seconds)."""
+        self.latency.record(latency)
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.enabled or len(self.latency) < self.min_samples:
+            return None
+        return self.latency.percentile(self.percentile)
+
+    async def run(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """`call` must start a fresh, identical request every time it is invoked."""
+        self.requests += 1
+        self._tokens = min(self.max_tokens, self._tokens + self.max_ratio)
+
+        delay = self._hedge_delay()
+        if delay is None:
+            return await call()
+
+        primary = asyncio.ensure_future(call())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or self._tokens < 1.0:
+                return await primary
+            if self.limiter is not None and self.limiter.queue_depth:
+                # Saturated: a hedge would only queue behind (or ahead of) real work
+                self.skipped_busy += 1
+                return await primary
+
+            self._tokens -= 1.0
+            self.hedged += 1
+            mcp_logger.info(f"[MCP hedge] {self.name}: no answer after {delay * 1000:.0f} ms, hedging")
+
+            hedge = asyncio.ensure_future(call())
+            tasks.add(hedge)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        p = self.latency.percentile(self.percentile)
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "skipped_busy": self.skipped_busy,
+            "hedge_after_ms": round(p * 1000, 1) if p else None,
+        }
@@ -0,0 +1,224 @@
+# mcp-edamam/app/services/jsonrpc.py
+#
+# Transport-agnostic JSON-RPC / MCP core. Shared by the HTTP router
+# (app/routers/rpc_router.py) and the stdio transport (app/stdio_server.py),
+# so it must not import FastAPI.
+
+from typing import Any, Dict, Optional, Union, List, Literal
+from pydantic import BaseModel
+
+from app.services.admission import OverloadedError, admission, classify_method
+from app.services.edamam_service import (
+    search_food,
+    get_food_nutrition_record,
+    get_nutrition_from_image,
+)
+from app.services.query_canonicalizer import canonicalize_query
+from app.services.mcp_meta import MCP_META
+from app.utils.logger import mcp_logger
+from app.utils.tracing import span, traced
+
+# ============================================================
+# JSON-RPC MODELS (Pydantic v2)
+# ============================================================
+
+class JSONRPCRequest(BaseModel):
+    jsonrpc: Literal["2.0"] = "2.0"
+    method: str
+    params: Optional[Dict[str, Any]] = None
+    id: Optional[Union[int, str]] = None
+
+
+class JSONRPCError(BaseModel):
+    code: int
+    message: str
+    data: Optional[Any] = None
+
+
+class JSONRPCResponse(BaseModel):
+    jsonrpc: Literal["2.0"] = "2.0"
+    result: Optional[Any] = None
+    error: Optional[JSONRPCError] = None
+    id: Optional[Union[int, str]] = None
+
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+# JSON-RPC server error returned when admission control sheds a request
+BUSY_ERROR_CODE = -32003
+
+
+def _error(req_id, code, msg, data=None):
+    return JSONRPCResponse(
+        id=req_id,
+        error=JSONRPCError(code=code, message=msg, data=data)
+    ).model_dump()
+
+
+@traced("_call_tool")
+async def _call_tool(name: str, args: Dict[str, Any]):
+    """Executes real Edamam-backed MCP functions."""
+    if name == "get_food_nutrition":
+        q = args.get("query")
+        if not q:
+            raise ValueError("Missing 'query'")
+
+        # Redirect if image
+        if isinstance(q, str) and any(ext in q.lower() for ext in [".jpg", ".jpeg", ".png", ".webp"]):
+            return await _call_tool("analyze_food_image", {"image_url": q})
+
+        # "banana 150g" → quantity=150 unless given explicitly
+        qty = args.get("quantity")
+        if qty is None:
+            qty = canonicalize_query(q).grams or 100
+        qty = float(qty)
+
+        food = await search_food(q)
+        if not food:
+            raise ValueError("Food not found")
+
+        nut = await get_food_nutrition_record(food["foodId"], qty)
+        return {
+            "food": food["label"],
+            "quantity": qty,
+            "nutrients": nut.to_dict()
+        }
+
+    #if name == "analyze_food_image":
+    if name in ["analyze_food_image", "get_nutrition_from_image"]:
+        img = args.get("image") or args.get("image_url")
+        if not img:
+            raise ValueError("Missing image/image_url")
+
+        v = await get_nutrition_from_image(img)
+        parsed = v.get("parsed", {})
+        recipe = v.get("recipe", {})
+
+        food_label = parsed.get("food", {}).get("label")
+        measure = parsed.get("measure", {})
+        qty = parsed.get("quantity", 1)
+        weight = measure.get("weight", 1)
+
+        return {
+            "analysis_type": "image",
+            "source": img,
+            "food": food_label,
+            "serving_weight_grams": round(qty * weight, 2),
+            "nutrients": parsed.get("food", {}).get("nutrients", {}),
+            "recipe": recipe
+        }
+
+    if name == "search_food":
+        q = args.get("query")
+        if not q:
+            raise ValueError("Missing 'query'")
+        limit = int(args.get("limit", 5))
+
+        f = await search_food(q)
+        if not f:
+            raise ValueError("No results found")
+
+        return {
+            "query": q,
+            "results": [f][:limit]
+        }
+
+    if name == "get_mcp_schema":
+        return MCP_META
+
+    raise ValueError(f"Unknown tool: {name}")
+
+
+# ============================================================
+# MCP-SPEC HANDLERS
+# ============================================================
+
+async def handle_initialize(req: JSONRPCRequest):
+    return {
+        "protocolVersion": "1.0",
+        "serverInfo": {
+            "name": "mcp-edamam",
+            "version": MCP_META["mcp_version"],
+            "description": MCP_META["description"]
+        },
+        "capabilities": {
+            "tools": True
+        }
+    }
+
+
+async def handle_client_caps(req: JSONRPCRequest):
+    return {"status": "ok"}
+
+
+async def handle_tools_list(req: JSONRPCRequest):
+    tools = []
+    for fn in MCP_META["functions"]:
+        tools.append({
+            "name": fn["function"]["name"],
+            "description": fn["function"]["description"],
+            "inputSchema": fn["function"]["parameters"]
+        })
+    return {"tools": tools}
+
+
+async def handle_tools_call(req: JSONRPCRequest):
+    params = req.params or {}
+    name = params.get("name")
+    args = params.get("arguments", {})
+
+    try:
+        result = await _call_tool(name, args)
+        return {"result": result}
+    except Exception as e:
+        return _error(req.id, -32002, "Tool execution failed", str(e))
+
+
+# ============================================================
+# METHOD ROUTING
+# ============================================================
+
+async def handle_request(req: JSONRPCRequest):
+    with span("handle_request", method=req.method):
+        cost_class = classify_method(req.method, req.params)
+        try:
+            async with admission.admit(cost_class):
+                return await _dispatch(req)
+        except OverloadedError as e:
+            return _error(req.id, BUSY_ERROR_CODE, "Server busy", {
+                "class": e.cost_class,
+                "retry_after": e.retry_after,
+            })
+
+
+async def _dispatch(req: JSONRPCRequest):
+
+    mcp_logger.info(f"[JSONRPC] method={req.method}, params={req.params}")
+
+    try:
+        if req.method == "initialize":
+            result = await handle_initialize(req)
+
+        elif req.method == "client/capabilities":
+            result = await handle_client_caps(req)
+
+        elif req.method == "tools/list":
+            result = await handle_tools_list(req)
+
+        elif req.method == "tools/call":
+            result = await handle_tools_call(req)
+
+        elif req.method in ["get_food_nutrition", "get_nutrition_from_image", "analyze_food_image", "search_food", "get_mcp_schema"]:
+        #if req.method in ["get_food_nutrition", "analyze_food_image", "search_food", "get_mcp_schema"]:
+            result = await _call_tool(req.method, req.params or {})
+
+        else:
+            return _error(req.id, -32601, f"Method not found: {req.method}")
+
+        with span("serialize"):
+            return JSONRPCResponse(id=req.id, result=result).model_dump()
+
+    except Exception as e:
+        return _error(req.id, -32603, "Internal error", str(e))
@@ -0,0 +1,311 @@
+# mcp-edamam/app/services/query_canonicalizer.py
+
+import json
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional
+
+# Optional JSON file with extra aliases: {"aubergine": "eggplant", ...}
+ALIAS_TABLE_PATH = os.getenv("EDAMAM_ALIAS_TABLE", "")
+
+# =====================================================================
+# STATIC TABLES
+# =====================================================================
+
+DEFAULT_ALIASES: Dict[str, str] = {
+    "aubergine": "eggplant",
+    "courgette": "zucchini",
+    "garbanzo": "chickpea",
+    "garbanzo bean": "chickpea",
+    "rocket": "arugula",
+    "capsicum": "bell pepper",
+    "spring onion": "scallion",
+    "green onion": "scallion",
+    "maize": "corn",
+    "prawn": "shrimp",
+    "minced beef": "ground beef",
+    "beef mince": "ground beef",
+    "porridge": "oatmeal",
+    "yoghurt": "yogurt",
+}
+
+# unit → grams per unit (None = recognised and stripped, but not a mass)
+UNITS: Dict[str, Optional[float]] = {
+    "mg": 0.001,
+    "g": 1.0, "gr": 1.0, "gram": 1.0, "grams": 1.0, "gramme": 1.0, "grammes": 1.0,
+    "kg": 1000.0, "kilo": 1000.0, "kilos": 1000.0, "kilogram": 1000.0, "kilograms": 1000.0,
+    "oz": 28.3495, "ounce": 28.3495, "ounces": 28.3495,
+    "lb": 453.592, "lbs": 453.592, "pound": 453.592, "pounds": 453.592,
+    "ml": None, "l": None, "liter": None, "liters": None, "litre": None, "litres": None,
+    "cup": None, "cups": None,
+    "tbsp": None, "tablespoon": None, "tablespoons": None,
+    "tsp": None, "teaspoon": None, "teaspoons": None,
+    "slice": None, "slices": None,
+    "piece": None, "pieces": None, "pc": None, "pcs": None,
+    "serving": None, "servings": None,
+}
+
+# Words that end in "s" but are already singular (or have no singular form)
+_INVARIANT = frozenset({
+    "hummus", "couscous", "asparagus", "molasses", "swiss", "citrus",
+    "hibiscus", "octopus", "grits", "series", "species",
+    "brussels", "schnapps", "chips", "fries", "oats", "news",
+})
+
+# Singulars ending in "e" that the suffix rules below would otherwise mangle
+# ("pies" → "py", "cookies" → "cooky", "quiches" → "quich")
+_E_SINGULARS = frozenset({
+    "pie", "cookie", "brownie", "smoothie", "veggie", "calorie", "zombie",
+    "quiche", "brioche", "ganache", "panache", "niche",
+})
+
+_IRREGULAR = {
+    "leaves": "leaf",
+    "loaves": "loaf",
+    "halves": "half",
+    "knives": "knife",
+    "geese": "goose",
+    "mice": "mouse",
+    "teeth": "tooth",
+}
+
+# Words after which a leading number is part of the name, not a count
+# ("7 grain bread", "3 musketeers bar", "7 up")
+_NUMBERED_NAMES = frozenset({
+    "grain", "bean", "cheese", "spice", "layer", "minute",
+    "musketeers", "up", "grand",
+})
+
+# =====================================================================
+# PRECOMPILED PATTERNS
+# =====================================================================
+
+_UNIT_ALT = "|".join(sorted(map(re.escape, UNITS), key=len, reverse=True))
+
+_NUMBER = r"\d+(?:[.,]\d+)?(?:/\d+)?(?![.,/]?\d)"
+
+# A number with a unit, anywhere ("banana 100g", "2 cups of flour").
+# The number may not be cut short ("1.5%" must not match as "1" + ".5%").
+_QUANTITY_RE = re.compile(
+    rf"(?<![\w.])({_NUMBER})\s*({_UNIT_ALT})(?!\w)(?!\s*%)(?:\s+of\b)?"
+)
+# A bare count, only at the start ("1 banana"); elsewhere a bare number is
+# part of the name ("omega 3 eggs", "chicken 65", "coke 0")
+_COUNT_RE = re.compile(
+    rf"^{_NUMBER}(?!\s*%)(?!\s*(?:{_UNIT_ALT}|{'|'.join(_NUMBERED_NAMES)})(?!\w))\s+(?:of\s+)?"
+)
+# "a cup of rice", "one slice of bread"
+_WORD_QUANTITY_RE = re.compile(rf"^(?:a|an|one)\s+({_UNIT_ALT})(?!\w)(?:\s+of\b)?")
+_ARTICLE_RE = re.compile(r"^(?:a|an|the|some)\s+")
+_TOKEN_RE = re.compile(r"\d+(?:[.,]\d+)*%?|[\w'%-]+")
+_ES_RE = re.compile(r"(?:ch|sh|ss|x|zz)es$")
+
+
+class CanonicalQuery(NamedTuple):
+    text: str                       # cache key
+    lookup: str                     # what is sent upstream: normalized query, quantity stripped
+    grams: Optional[float] = None   # mass quantity found in the query, if any
+
+
+# =====================================================================
+# HELPERS
+# =====================================================================
+
+@lru_cache(maxsize=8)
+def load_alias_table(path: str = "") -> Dict[str, str]:
+    """Built-in aliases merged with an optional JSON file. Memoized per path."""
+    table = dict(DEFAULT_ALIASES)
+    if path:
+        with open(path, encoding="utf-8") as fh:
+            extra = json.load(fh)
+        for alias, target in extra.items():
+            table[_normalize_text(alias)] = _normalize_text(target)
+    return table
+
+
+def _normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(text.replace("⁄", "/").split())
+
+
+def _parse_number(raw: str) -> float:
+    raw = raw.replace(",", ".")
+    if "/" in raw:
+        num, den = raw.split("/", 1)
+        return float(num) / float(den) if float(den) else 0.0
+    return float(raw)
+
+
+def singularize(word: str) -> str:
+    if len(word) <= 3 or word in _INVARIANT or not word.endswith("s"):
+        return word
+    if word in _IRREGULAR:
+        return _IRREGULAR[word]
+    if word[:-1] in _E_SINGULARS:
+        return word[:-1]
+    if word.endswith("ies"):
+        # "berries" → "berry", but "pies" / "ties" → "pie" / "tie"
+        return word[:-1] if len(word) <= 4 else word[:-3] + "y"
+    if word.endswith("oes") or _ES_RE.search(word):
+        return word[:-2]
+    if word.endswith(("ss", "us", "is")):
+        return word
+    return word[:-1]
+
+
+# =====================================================================
+# PUBLIC API
+# =====================================================================
+
+@lru_cache(maxsize=4096)
+def canonicalize_query(query: str) -> CanonicalQuery:
+    """
+    Map a free-text food query to a stable cache key:
+    "  Bananas ", "banana 100g", "1 banana" → "banana".
+    `lookup` keeps the user's wording (normalized, quantity stripped) for the
+    upstream call, so singularization and aliases only affect caching.
+    UPC/EAN/PLU codes are returned untouched (only trimmed).
+    """
+    stripped = query.strip()
+    if stripped.isdigit():
+        return CanonicalQuery(stripped, stripped)
+
+    normalized = _normalize_text(stripped)
+
+    grams = None
+    match = _WORD_QUANTITY_RE.match(normalized)
+    if match:
+        grams = UNITS[match.group(1)]
+        text = normalized[match.end():]
+    else:
+        text = normalized
+    text = _COUNT_RE.sub("", text)
+    for match in _QUANTITY_RE.finditer(text):
+        factor = UNITS[match.group(2)]
+        if factor is not None and grams is None:
+            grams = round(_parse_number(match.group(1)) * factor, 3)
+    text = " ".join(_QUANTITY_RE.sub(" ", text).split())
+
+    tokens = _TOKEN_RE.findall(_ARTICLE_RE.sub("", text))
+    if not tokens:
+        return CanonicalQuery(normalized, normalized, grams)
+
+    tokens[-1] = singularize(tokens[-1])
+    key = " ".join(tokens)
+
+    aliases = load_alias_table(ALIAS_TABLE_PATH)
+    return CanonicalQuery(aliases.get(key, key), text, grams)
+
+
+# =====================================================================
+# BENCHMARK / HIT-RATE REPLAY / SELF-CHECK
+#   python -m app.services.query_canonicalizer [logs/mcp_requests.log]
+#   python -m app.services.query_canonicalizer --check
+# =====================================================================
+
+# query → (cache key, upstream lookup, grams)
+EXAMPLES = {
+    "  Bananas ": ("banana", "bananas", None),
+    "banana 100g": ("banana", "banana", 100.0),
+    "1 banana": ("banana", "banana", None),
+    "almonds 50 g": ("almond", "almonds", 50.0),
+    "aubergine": ("eggplant", "aubergine", None),
+    "pies": ("pie", "pies", None),
+    "apple pies": ("apple pie", "apple pies", None),
+    "cookies": ("cookie", "cookies", None),
+    "brownies": ("brownie", "brownies", None),
+    "smoothies": ("smoothie", "smoothies", None),
+    "berries": ("berry", "berries", None),
+    "quiches": ("quiche", "quiches", None),
+    "peaches": ("peach", "peaches", None),
+    "tomatoes": ("tomato", "tomatoes", None),
+    "news": ("news", "news", None),
+    "hummus": ("hummus", "hummus", None),
+    "1.5% milk": ("1.5% milk", "1.5% milk", None),
+    "2 1/2 cups of flour": ("flour", "flour", None),
+    "a cup of rice": ("rice", "rice", None),
+    "the banana": ("banana", "the banana", None),
+    "2 eggs": ("egg", "eggs", None),
+    "omega 3 eggs": ("omega 3 egg", "omega 3 eggs", None),
+    "chicken 65": ("chicken 65", "chicken 65", None),
+    "coke 0": ("coke 0", "coke 0", None),
+    "7 grain bread": ("7 grain bread", "7 grain bread", None),
+    "3 musketeers bar": ("3 musketeers bar", "3 musketeers bar", None),
+    "0123456789012": ("0123456789012", "0123456789012", None),
+}
+
+
+def check() -> int:
+    """Compare canonicalize_query against EXAMPLES; return the number of mismatches."""
+    failures = 0
+    for query, expected in EXAMPLES.items():
+        got = tuple(canonicalize_query.__wrapped__(query))
+        if got != expected:
+            failures += 1
+            print(f"FAIL {query!r}: expected {expected}, got {got}")
+    print(f"{len(EXAMPLES) - failures}/{len(EXAMPLES)} examples OK")
+    return failures
+
+# Raw queries as received, logged on every search (cache hits included)
+_LOGGED_QUERY_RE = re.compile(r"\[MCP\] Search query: '(.*)'$")
+
+
+def _replay(queries, cache_size: int = 1024):
+    from app.services.cache import TTLCache
+
+    raw_cache = TTLCache(maxsize=cache_size)
+    canon_cache = TTLCache(maxsize=cache_size)
+    for q in queries:
+        if raw_cache.get(q) is None:
+            raw_cache.set(q, True)
+        key = canonicalize_query(q).text
+        if canon_cache.get(key) is None:
+            canon_cache.set(key, True)
+    return raw_cache.stats(), canon_cache.stats()
+
+
+def main(argv=None) -> None:
+    import sys
+    import timeit
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--check"]:
+        sys.exit(1 if check() else 0)
+    if argv:
+        with open(argv[0], encoding="utf-8") as fh:
+            queries = [m.group(1) for m in map(_LOGGED_QUERY_RE.search, fh) if m]
+    else:
+        queries = ["Banana", " bananas ", "banana 100g", "1 banana", "2 Apples",
+                   "apple", "almonds 50 g", "Almond", "aubergine", "eggplants"]
+
+    if not queries:
+        print("No search queries found.")
+        return
+
+    sample = queries[:1000]
+    uncached = canonicalize_query.__wrapped__
+
+    def cold():
+        for q in sample:
+            uncached(q)
+
+    def warm():
+        for q in sample:
+            canonicalize_query(q)
+
+    runs = max(1, 10000 // len(sample))
+    cold_us = min(timeit.repeat(cold, number=runs, repeat=5)) / runs / len(sample) * 1e6
+    warm_us = min(timeit.repeat(warm, number=runs, repeat=5)) / runs / len(sample) * 1e6
+
+    raw, canon = _replay(queries)
+    print(f"queries replayed      : {len(queries)}")
+    print(f"overhead (uncached)   : {cold_us:.2f} µs/query")
+    print(f"overhead (memoized)   : {warm_us:.2f} µs/query")
+    print(f"hit rate (raw key)    : {raw['hit_rate']:.2%}")
+    print(f"hit rate (canonical)  : {canon['hit_rate']:.2%}")
+
+
+if __name__ == "__main__":
+    main()
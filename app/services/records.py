@@ -0,0 +1,228 @@
+# mcp-edamam/app/services/records.py
+#
+# Compact in-memory representation of Edamam foods and nutrient totals.
+#
+# Cached / deduplicated results are kept as slotted records instead of nested
+# dicts: nutrient codes, labels and units are interned once per process, the
+# tuple of codes is shared between records with the same nutrient set, and
+# quantities live in a flat array('d') (plus bitmasks of which were ints or
+# null, so `89` comes back as `89`, not `89.0`, and `null` as `null`). Records are turned back into the usual
+# response dicts only when serialized (`to_dict`).
+
+import math
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+# code → (label, unit), shared by every NutritionRecord
+_NUTRIENT_META: Dict[str, Tuple[str, str]] = {}
+# Interned code tuples, so records with the same nutrient set share one tuple
+_CODE_SETS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _code_set(codes) -> Tuple[str, ...]:
+    key = tuple(sys.intern(c) for c in codes)
+    return _CODE_SETS.setdefault(key, key)
+
+
+def _pack(numbers) -> Tuple[array, int, int]:
+    """Numbers as array('d') plus bitmasks of the positions that held ints / None (stored as NaN)."""
+    values = array("d")
+    ints = nones = 0
+    for i, n in enumerate(numbers):
+        if n is None:
+            nones |= 1 << i
+            values.append(math.nan)
+            continue
+        if isinstance(n, int):
+            ints |= 1 << i
+        values.append(float(n))
+    return values, ints, nones
+
+
+def _unpack(values: array, ints: int, nones: int) -> List[Any]:
+    if not (ints or nones):
+        return values.tolist()
+    return [
+        None if nones >> i & 1 else int(v) if ints >> i & 1 else v
+        for i, v in enumerate(values)
+    ]
+
+
+def _restore_food(food_id, label, category, image, codes, values, ints, nones) -> "FoodRecord":
+    return FoodRecord(food_id, label, _intern(category), image, _code_set(codes), values, ints, nones)
+
+
+def _restore_nutrition(codes, quantities, ints, nones, meta) -> "NutritionRecord":
+    for code, (label, unit) in zip(codes, meta):
+        _NUTRIENT_META.setdefault(sys.intern(code), (_intern(label), _intern(unit)))
+    return NutritionRecord(_code_set(codes), quantities, ints, nones)
+
+
+class FoodRecord:
+    """One parser match (the dict `search_food` returns)."""
+
+    __slots__ = ("food_id", "label", "category", "image", "codes", "values", "ints", "nones")
+
+    def __init__(self, food_id, label, category, image, codes, values, ints=0, nones=0):
+        self.food_id = food_id
+        self.label = label
+        self.category = category
+        self.image = image
+        self.codes = codes
+        self.values = values
+        self.ints = ints
+        self.nones = nones
+
+    @classmethod
+    def from_edamam(cls, food: Dict[str, Any]) -> "FoodRecord":
+        nutrients = food.get("nutrients")
+        if nutrients is None:
+            codes, values, ints, nones = (), None, 0, 0
+        else:
+            codes = _code_set(nutrients)
+            values, ints, nones = _pack(nutrients[c] for c in codes)
+        return cls(
+            food.get("foodId"),
+            food.get("label"),
+            _intern(food.get("category")),
+            food.get("image"),
+            codes,
+            values,
+            ints,
+            nones,
+        )
+
+    def __reduce__(self):
+        # Re-intern on unpickle (records built in an offload worker process)
+        return _restore_food, (
+            self.food_id, self.label, self.category, self.image,
+            self.codes, self.values, self.ints, self.nones,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "foodId": self.food_id,
+            "label": self.label,
+            "category": self.category,
+            "nutrients": None if self.values is None else dict(zip(self.codes, _unpack(self.values, self.ints, self.nones))),
+            "image": self.image,
+        }
+
+
+class NutritionRecord:
+    """`totalNutrients` of a nutrients response: {code: {label, quantity, unit}}."""
+
+    __slots__ = ("codes", "quantities", "ints", "nones")
+
+    def __init__(self, codes, quantities, ints=0, nones=0):
+        self.codes = codes
+        self.quantities = quantities
+        self.ints = ints
+        self.nones = nones
+
+    @classmethod
+    def from_edamam(cls, response: Dict[str, Any]) -> "NutritionRecord":
+        totals = response.get("totalNutrients") or {}
+        codes = _code_set(totals)
+        for code in codes:
+            if code not in _NUTRIENT_META:
+                entry = totals[code]
+                _NUTRIENT_META[code] = (_intern(entry.get("label")), _intern(entry.get("unit")))
+        return cls(codes, *_pack(totals[c].get("quantity", 0) for c in codes))
+
+    def __reduce__(self):
+        # Labels/units live in the per-process _NUTRIENT_META: carry them along
+        meta = tuple(_NUTRIENT_META[c] for c in self.codes)
+        return _restore_nutrition, (self.codes, self.quantities, self.ints, self.nones, meta)
+
+    def scaled(self, factor: float) -> "NutritionRecord":
+        """Totals for `factor` times the quantity (gram-based totals scale linearly; always floats)."""
+        return NutritionRecord(self.codes, array("d", (q * factor for q in self.quantities)), 0, self.nones)
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for code, quantity in zip(self.codes, _unpack(self.quantities, self.ints, self.nones)):
+            label, unit = _NUTRIENT_META[code]
+            out[code] = {"label": label, "quantity": quantity, "unit": unit}
+        return out
+
+
+def food_from_parser(data: Dict[str, Any]) -> Optional[FoodRecord]:
+    """Top match of a parser response (`parsed`, else `hints`) as a FoodRecord, or None."""
+    food = None
+    if data.get("parsed"):
+        food = data["parsed"][0]["food"]
+    elif data.get("hints"):
+        food = data["hints"][0]["food"]
+    return FoodRecord.from_edamam(food) if food else None
+
+
+# =====================================================================
+# MEMORY BENCHMARK
+#   python -m app.services.records [N]
+# =====================================================================
+
+def _sample_food(i: int) -> Dict[str, Any]:
+    return {
+        "foodId": f"food_{i:016x}abcdefghij",
+        "label": f"Food {i}",
+        "category": "Generic foods",
+        "image": f"https://www.edamam.com/food-img/{i:032x}.jpg",
+        "nutrients": {
+            "ENERC_KCAL": 89.0 + i % 7, "PROCNT": 1.09, "FAT": 0.33,
+            "CHOCDF": 22.84, "FIBTG": 2.6,
+        },
+    }
+
+
+def _sample_totals(i: int) -> Dict[str, Any]:
+    names = [
+        ("ENERC_KCAL", "Energy", "kcal"), ("FAT", "Total lipid (fat)", "g"),
+        ("FASAT", "Fatty acids, total saturated", "g"), ("CHOCDF", "Carbohydrate, by difference", "g"),
+        ("FIBTG", "Fiber, total dietary", "g"), ("SUGAR", "Sugars, total", "g"),
+        ("PROCNT", "Protein", "g"), ("CHOLE", "Cholesterol", "mg"), ("NA", "Sodium, Na", "mg"),
+        ("CA", "Calcium, Ca", "mg"), ("MG", "Magnesium, Mg", "mg"), ("K", "Potassium, K", "mg"),
+        ("FE", "Iron, Fe", "mg"), ("ZN", "Zinc, Zn", "mg"), ("VITC", "Vitamin C", "mg"),
+        ("VITB6A", "Vitamin B-6", "mg"), ("VITB12", "Vitamin B-12", "µg"), ("VITD", "Vitamin D", "µg"),
+    ]
+    # json.loads creates fresh strings per response, so do the same here
+    return {"totalNutrients": {
+        "".join(code): {"label": "".join(label), "quantity": 1.5 * i, "unit": "".join(unit)}
+        for code, label, unit in names
+    }}
+
+
+def _measure(build, n: int) -> float:
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(i) for i in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / n
+
+
+def main(argv=None) -> None:
+    n = int((argv or sys.argv[1:] or ["20000"])[0])
+    rows = [
+        ("food (dict)", lambda i: _sample_food(i)),
+        ("food (FoodRecord)", lambda i: FoodRecord.from_edamam(_sample_food(i))),
+        ("nutrition totals (dict)", lambda i: _sample_totals(i)["totalNutrients"]),
+        ("nutrition totals (NutritionRecord)", lambda i: NutritionRecord.from_edamam(_sample_totals(i))),
+    ]
+    print(f"{n} items, bytes retained per item:")
+    for name, build in rows:
+        print(f"  {name:<36} {_measure(build, n):8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# mcp-edamam/app/stdio_server.py
+#
+# Stdio MCP transport for agents running on the same host:
+#
+#   python -m app.stdio_server
+#
+# Reads newline-delimited JSON-RPC from stdin and writes one JSON response
+# per line to stdout. Requests are handled concurrently, so responses may be
+# written out of order — clients match them by `id`. Notifications (no `id`)
+# get no response. Does not import FastAPI or uvicorn.
+
+import asyncio
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+from app.services.jsonrpc import JSONRPCRequest, _error, handle_request  # noqa: E402
+
+# Max requests processed at once; further lines wait before being parsed
+MAX_CONCURRENCY = int(os.getenv("MCP_STDIO_CONCURRENCY", "64"))
+# Longest accepted input line (base64 images can be large)
+MAX_LINE_BYTES = int(os.getenv("MCP_STDIO_MAX_LINE", str(32 * 1024 * 1024)))
+
+
+async def _handle_item(item):
+    try:
+        req = JSONRPCRequest.model_validate(item)
+    except Exception as e:
+        return _error(None, -32600, "Invalid Request", str(e))
+    response = await handle_request(req)
+    if isinstance(item, dict) and "id" not in item:
+        return None
+    return response
+
+
+async def _handle_line(line: bytes):
+    try:
+        body = json.loads(line)
+    except ValueError as e:
+        return _error(None, -32700, "Parse error", str(e))
+
+    if isinstance(body, list):
+        responses = await asyncio.gather(*(_handle_item(item) for item in body))
+        return [r for r in responses if r is not None] or None
+
+    return await _handle_item(body)
+
+
+def _request_id(line: bytes):
+    try:
+        body = json.loads(line)
+    except ValueError:
+        return None
+    return body.get("id") if isinstance(body, dict) else None
+
+
+def _write(out, response) -> None:
+    out.write(json.dumps(response, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n")
+    out.flush()
+
+
+async def serve(stdin=None, stdout=None) -> None:
+    loop = asyncio.get_running_loop()
+    stdin = stdin or sys.stdin.buffer
+    out = stdout or sys.stdout.buffer
+
+    reader = asyncio.StreamReader(limit=MAX_LINE_BYTES)
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stdin)
+        readline = reader.readline
+    except ValueError:
+        # stdin redirected from a regular file: read it from a worker thread
+        async def readline():
+            return await loop.run_in_executor(None, stdin.readline)
+
+    slots = asyncio.Semaphore(MAX_CONCURRENCY)
+    tasks = set()
+
+    async def process(line: bytes):
+        try:
+            try:
+                response = await _handle_line(line)
+            except Exception as e:
+                # Never leave a client waiting on an id that will not be answered
+                response = _error(_request_id(line), -32603, "Internal error", str(e))
+            if response is not None:
+                _write(out, response)
+        finally:
+            slots.release()
+
+    while True:
+        try:
+            line = await readline()
+        except ValueError:
+            # Line longer than MAX_LINE_BYTES: reject it and skip to the next one
+            _write(out, _error(None, -32600, "Invalid Request", "Request line too long"))
+            continue
+        if not line:
+            break
+        if not line.strip():
+            continue
+
+        await slots.acquire()
+        task = asyncio.create_task(process(line))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main() -> None:
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# app/utils/capture.py
+#
+# Traffic capture for offline replay (see app/replay.py).
+#
+#   MCP_CAPTURE_FILE=capture.ndjson      record inbound /v1/rpc + /v1/ai/query bodies
+#   MCP_CAPTURE_UPSTREAM=1               also record Edamam responses
+#   MCP_REPLAY_UPSTREAM=capture.ndjson   answer Edamam calls from a capture file
+#
+# One compact JSON object per line, `t` being wall-clock (epoch) seconds so
+# captures appended across restarts or by several workers stay ordered:
+#   {"t": 1760870000.234, "kind": "request", "path": "/v1/rpc/", "body": {...}}
+#   {"t": 1760870000.240, "kind": "upstream", "key": "GET /api/...?ingr=banana",
+#    "status": 200, "latency": 0.21, "content_type": "application/json", "body": "{...}"}
+# Upstream bodies are stored as received (raw text, not re-parsed) and replayed
+# byte for byte. Lines are serialized and written by one background thread, so
+# large bodies don't stall the event loop and lines never interleave.
+# Credentials (app_id / app_key) are never written.
+
+import asyncio
+import itertools
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import httpx
+
+CAPTURE_FILE = os.getenv("MCP_CAPTURE_FILE", "")
+CAPTURE_UPSTREAM = os.getenv("MCP_CAPTURE_UPSTREAM", "0").lower() in ("1", "true", "yes")
+REPLAY_UPSTREAM_FILE = os.getenv("MCP_REPLAY_UPSTREAM", "")
+# Multiply recorded upstream latency when replaying (0 = answer immediately)
+REPLAY_UPSTREAM_LATENCY = float(os.getenv("MCP_REPLAY_UPSTREAM_LATENCY", "1"))
+
+_SECRET_PARAMS = ("app_id", "app_key")
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def upstream_key(method: str, url: httpx.URL, content: bytes) -> str:
+    """Stable identity of an upstream call, without credentials."""
+    params = sorted((k, v) for k, v in url.params.multi_items() if k not in _SECRET_PARAMS)
+    key = f"{method} {url.path}"
+    if params:
+        key += "?" + "&".join(f"{k}={v}" for k, v in params)
+    if content:
+        try:
+            key += " " + _dumps(json.loads(content))
+        except ValueError:
+            key += " " + content.decode("utf-8", "replace")
+    return key
+
+
+# =====================================================================
+# RECORDER
+# =====================================================================
+
+class TrafficRecorder:
+    def __init__(self, path: str, upstream: bool = False):
+        self.path = path
+        self.upstream = upstream
+        self._fh = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._fh = open(path, "a", encoding="utf-8", buffering=1)
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mcp-capture")
+
+    @property
+    def enabled(self) -> bool:
+        return self._fh is not None
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        record["t"] = round(time.time(), 4)
+        self._writer.submit(self._write_line, record)
+
+    def _write_line(self, record: Dict[str, Any]) -> None:
+        self._fh.write(_dumps(record) + "\n")
+
+    def record_request(self, path: str, body: Any) -> None:
+        if self._fh:
+            self._write({"kind": "request", "path": path, "body": body})
+
+    def record_upstream(self, resp: httpx.Response, latency: float) -> None:
+        if not (self._fh and self.upstream):
+            return
+        req = resp.request
+        record: Dict[str, Any] = {
+            "kind": "upstream",
+            "key": upstream_key(req.method, req.url, req.content),
+            "status": resp.status_code,
+            "latency": round(latency, 4),
+            "content_type": resp.headers.get("content-type", ""),
+            "body": resp.content.decode("utf-8", "replace"),
+        }
+        self._write(record)
+
+
+recorder = TrafficRecorder(CAPTURE_FILE, upstream=CAPTURE_UPSTREAM)
+
+
+# =====================================================================
+# REPLAY TRANSPORT
+# =====================================================================
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """httpx transport that answers upstream calls from a capture file."""
+
+    def __init__(self, path: str, latency_scale: float = 1.0):
+        self.latency_scale = latency_scale
+        self.misses = 0
+        recorded = defaultdict(list)
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                record = json.loads(line)
+                if record.get("kind") == "upstream":
+                    recorded[record["key"]].append(record)
+        # Repeated calls cycle through the responses recorded for that key
+        self._responses = {key: itertools.cycle(items) for key, items in recorded.items()}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = upstream_key(request.method, request.url, await request.aread())
+        responses = self._responses.get(key)
+        if responses is None:
+            self.misses += 1
+            return httpx.Response(404, json={"error": "not in capture", "key": key}, request=request)
+
+        record = next(responses)
+        if self.latency_scale > 0:
+            await asyncio.sleep(record.get("latency", 0) * self.latency_scale)
+        if "body" in record:
+            headers = {"content-type": record["content_type"]} if record.get("content_type") else None
+            return httpx.Response(
+                record["status"], content=record["body"].encode("utf-8"), headers=headers, request=request
+            )
+        # Captures from before raw bodies were recorded
+        if "json" in record:
+            return httpx.Response(record["status"], json=record["json"], request=request)
+        return httpx.Response(record["status"], text=record.get("text", ""), request=request)
+
+
+def make_upstream_transport() -> Optional[httpx.AsyncBaseTransport]:
+    if REPLAY_UPSTREAM_FILE:
+        return ReplayTransport(REPLAY_UPSTREAM_FILE, REPLAY_UPSTREAM_LATENCY)
+    return None
@@ -0,0 +1,120 @@
+# app/utils/http_cache.py
+#
+# Cacheable JSON responses for read-only REST routes:
+# strong content-hash ETags, If-None-Match → 304, Cache-Control/Vary headers,
+# and gzip (or brotli, if the optional `brotli` package is installed)
+# compression above MCP_COMPRESS_MIN_BYTES.
+
+import gzip
+import hashlib
+import json
+import os
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from app.services.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("MCP_COMPRESS_MIN_BYTES", "1024"))
+
+# Compressed bodies by (etag, encoding), so repeat payloads are compressed once
+_compressed = TTLCache(maxsize=512, ttl=3600.0)
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _coded_etag(etag: str, encoding: Optional[str]) -> str:
+    """Strong ETags must differ per content coding: `"<hash>"` → `"<hash>-gzip"`."""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def _etag_matches(header: Optional[str], *etags: str) -> bool:
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") in etags:
+            return True
+    return False
+
+
+def _pick_encoding(header: Optional[str]) -> Optional[str]:
+    accepted = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+
+    for encoding in (("br",) if brotli else ()) + ("gzip",):
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def _compress(body: bytes, etag: str, encoding: str) -> bytes:
+    key = (etag, encoding)
+    data = _compressed.get(key)
+    if data is None:
+        if encoding == "br":
+            data = brotli.compress(body, quality=5)
+        else:
+            data = gzip.compress(body, compresslevel=6)
+        _compressed.set(key, data)
+    return data
+
+
+def _json_body(content: Any) -> bytes:
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class StaticJSON:
+    """Content that never changes at runtime, serialized and hashed once."""
+
+    def __init__(self, content: Any):
+        self.body = _json_body(content)
+        self.etag = _etag(self.body)
+
+
+def cacheable_json(request: Request, content: Any, max_age: int) -> Response:
+    """JSON response with ETag/Cache-Control; 304 if the client copy is current."""
+    if isinstance(content, StaticJSON):
+        body, etag = content.body, content.etag
+    else:
+        body = _json_body(content)
+        etag = _etag(body)
+
+    encoding = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = _pick_encoding(request.headers.get("accept-encoding"))
+
+    headers = {
+        "ETag": _coded_etag(etag, encoding),
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "Accept-Encoding",
+    }
+
+    # Either tag names the same content, whichever coding the client stored
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"], etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        body = _compress(body, etag, encoding)
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, media_type="application/json", headers=headers)
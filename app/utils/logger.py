@@ -2,6 +2,8 @@
 import logging
 import os
 
+from app.utils.tracing import span
+
 LOG_DIR = os.path.join(os.path.dirname(__file__), "../../logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 
@@ -17,7 +19,15 @@ formatter = logging.Formatter(
     datefmt="%Y-%m-%d %H:%M:%S"
 )
 
-file_handler = logging.FileHandler(MCP_LOG_FILE, encoding="utf-8")
+class TracedFileHandler(logging.FileHandler):
+    """FileHandler whose writes show up as `log` spans in request traces."""
+
+    def emit(self, record):
+        with span("log"):
+            super().emit(record)
+
+
+file_handler = TracedFileHandler(MCP_LOG_FILE, encoding="utf-8")
 file_handler.setFormatter(formatter)
 
 # За да не дублира логове в root
@@ -0,0 +1,201 @@
+# app/utils/offload.py
+#
+# Keep CPU-heavy work off the event loop.
+#
+# Payloads of MCP_OFFLOAD_MIN_BYTES or more are handled off the loop; smaller
+# ones stay inline where a pool hop would cost more than it saves.
+#
+# - Base64 image data URIs are decoded / hashed / JSON-escaped in chunks in a
+#   worker pool (threads by default, MCP_OFFLOAD_EXECUTOR=process), so the
+#   GIL is handed back to the loop between chunks.
+# - Big JSON bodies are parsed in a process pool: json.loads holds the GIL for
+#   the whole parse, so a thread would not free the loop. The parse and a
+#   caller-supplied reduction run together in the worker (e.g. a response
+#   → FoodRecord / NutritionRecord), so only a small result is unpickled on
+#   the loop.
+#
+# EventLoopLagMonitor measures how late the loop wakes up, to confirm stalls
+# are gone (GET /v1/metrics/event-loop).
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+OFFLOAD_EXECUTOR = os.getenv("MCP_OFFLOAD_EXECUTOR", "thread")
+OFFLOAD_WORKERS = int(os.getenv("MCP_OFFLOAD_WORKERS", "4"))
+OFFLOAD_MIN_BYTES = int(os.getenv("MCP_OFFLOAD_MIN_BYTES", str(256 * 1024)))
+LOOP_LAG_INTERVAL = float(os.getenv("MCP_LOOP_LAG_INTERVAL_MS", "100")) / 1000.0
+
+_DATA_URI_RE = re.compile(r"^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?P<params>(?:;[\w.+-]+=[\w.+-]+)*);base64,")
+
+# Big strings are processed in chunks so a worker thread gives the GIL back to
+# the event loop between chunks instead of holding it for a whole image.
+_B64_CHUNK = 256 * 1024  # characters, multiple of 4
+
+_executor: Optional[Executor] = None
+_process_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_process_executor() -> ProcessPoolExecutor:
+    global _process_executor
+    if _process_executor is None:
+        _process_executor = ProcessPoolExecutor(max_workers=OFFLOAD_WORKERS)
+    return _process_executor
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if OFFLOAD_EXECUTOR == "process":
+            _executor = _get_process_executor()
+        else:
+            _executor = ThreadPoolExecutor(max_workers=OFFLOAD_WORKERS, thread_name_prefix="mcp-offload")
+    return _executor
+
+
+async def run_cpu(fn: Callable, *args, size: int) -> Any:
+    """Run fn(*args) inline if `size` is small, otherwise in the offload pool."""
+    if size < OFFLOAD_MIN_BYTES:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+
+
+# =====================================================================
+# CPU-BOUND HELPERS (module-level so a process pool can pickle them)
+# =====================================================================
+
+class InvalidImageError(ValueError):
+    """Malformed image data URI (a client error, not an upstream one)."""
+
+
+def inspect_data_uri(uri: str) -> Dict[str, Any]:
+    """Validate a base64 image data URI; return its MIME type, size and SHA-256."""
+    match = _DATA_URI_RE.match(uri)
+    if not match:
+        raise InvalidImageError("Invalid data URI: expected data:image/...;base64,<payload>")
+    mime = match.group("mime") or ""
+    if not mime.startswith("image/"):
+        raise InvalidImageError(f"Invalid data URI: unsupported media type '{mime or 'text/plain'}'")
+
+    digest = hashlib.sha256()
+    size = 0
+    carry = ""
+    try:
+        for pos in range(match.end(), len(uri), _B64_CHUNK):
+            chunk = carry + uri[pos:pos + _B64_CHUNK]
+            # Line-wrapped (MIME-style) base64 is accepted, as before validation
+            if any(ws in chunk for ws in "\n\r\t "):
+                chunk = "".join(chunk.split())
+            cut = len(chunk) - len(chunk) % 4
+            chunk, carry = chunk[:cut], chunk[cut:]
+            raw = base64.b64decode(chunk, validate=True)
+            digest.update(raw)
+            size += len(raw)
+        if carry:
+            raise ValueError("Incorrect padding")
+    except (binascii.Error, ValueError) as e:
+        raise InvalidImageError(f"Invalid data URI: bad base64 payload ({e})")
+    if not size:
+        raise InvalidImageError("Invalid data URI: empty payload")
+    return {"mime": mime, "bytes": size, "sha256": digest.hexdigest()}
+
+
+def image_request_body(image: str) -> bytes:
+    """`{"image_url": image}` as JSON bytes, escaped chunk by chunk."""
+    parts = [b'{"image_url":"']
+    for pos in range(0, len(image), _B64_CHUNK):
+        parts.append(json.dumps(image[pos:pos + _B64_CHUNK], ensure_ascii=False)[1:-1].encode("utf-8"))
+    parts.append(b'"}')
+    return b"".join(parts)
+
+
+def _loads(raw: bytes, reducer: Optional[Callable[[Any], Any]] = None) -> Any:
+    data = json.loads(raw)
+    return data if reducer is None else reducer(data)
+
+
+async def parse_json(raw: bytes, reducer: Optional[Callable[[Any], Any]] = None) -> Any:
+    """
+    json.loads(raw), then `reducer(data)` if given. Large bodies go to the
+    process pool; `reducer` must then be picklable (module-level function or
+    classmethod) and should return something small.
+    """
+    if len(raw) < OFFLOAD_MIN_BYTES:
+        return _loads(raw, reducer)
+    return await asyncio.get_running_loop().run_in_executor(_get_process_executor(), _loads, raw, reducer)
+
+
+async def encode_image_request(image: str) -> bytes:
+    return await run_cpu(image_request_body, image, size=len(image))
+
+
+async def check_data_uri(uri: str) -> Dict[str, Any]:
+    return await run_cpu(inspect_data_uri, uri, size=len(uri))
+
+
+# =====================================================================
+# EVENT-LOOP LAG
+# =====================================================================
+
+class EventLoopLagMonitor:
+    """Sleeps `interval` in a loop and records how late each wake-up is."""
+
+    def __init__(self, interval: float = 0.1, window: int = 600):
+        self.interval = interval
+        self._samples: deque = deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self._samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self._samples)
+
+        def pct(p):
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100.0))] * 1000, 2)
+
+        return {
+            "running": self._task is not None,
+            "interval_ms": self.interval * 1000,
+            "samples": len(ordered),
+            "lag_ms": {
+                "last": round(self._samples[-1] * 1000, 2) if ordered else None,
+                "p50": pct(50),
+                "p99": pct(99),
+                "max_window": round(ordered[-1] * 1000, 2) if ordered else None,
+                "max_since_start": round(self.max_lag * 1000, 2),
+            },
+            "offload": {
+                "executor": OFFLOAD_EXECUTOR,
+                "workers": OFFLOAD_WORKERS,
+                "min_bytes": OFFLOAD_MIN_BYTES,
+            },
+        }
+
+
+loop_lag = EventLoopLagMonitor(LOOP_LAG_INTERVAL)
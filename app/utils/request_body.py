@@ -0,0 +1,41 @@
+# app/utils/request_body.py
+#
+# Request bodies that may carry multi-MB base64 images are read raw and parsed
+# through offload.parse_json (off the event loop when large) instead of by
+# FastAPI inline. Errors match FastAPI's own: 422 with the usual `detail` list.
+
+from typing import Any, Dict, Type, TypeVar
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+from app.utils.offload import parse_json
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+def body_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """`openapi_extra` that documents `model` as the JSON request body."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema()}},
+        }
+    }
+
+
+async def read_model(request: Request, model: Type[Model]) -> Model:
+    raw = await request.body()
+    try:
+        body = await parse_json(raw)
+    except ValueError as e:
+        raise RequestValidationError([{
+            "type": "json_invalid", "loc": ("body",), "msg": f"JSON decode error: {e}", "input": {},
+        }])
+    try:
+        return model.model_validate(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        )
@@ -0,0 +1,295 @@
+# app/utils/tracing.py
+#
+# Lightweight per-request spans + optional sampling profiler.
+#
+# - Every traced request records timed spans (handle_request → _call_tool →
+#   edamam_service → upstream). Requests slower than MCP_SLOW_REQUEST_MS are
+#   kept in a ring buffer (see GET /v1/metrics/slow-requests).
+# - Profiled requests (sampled at MCP_PROFILE_SAMPLE_RATE, or header
+#   `X-MCP-Profile: 1` when MCP_PROFILE_HEADER=1) write `<id>.trace.json`
+#   (Chrome trace / Perfetto) and `<id>.folded` (flamegraph.pl / speedscope)
+#   into MCP_PROFILE_DIR, which keeps only the last MCP_PROFILE_KEEP profiles.
+#   One process-wide stack sampler runs on the event-loop thread while any
+#   profiled request is in flight; each profile gets the samples taken during
+#   its own time window. Profiles are therefore loop-wide: they also show
+#   whatever concurrent requests ran on the loop in that window.
+
+import asyncio
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+PROFILE_HEADER = "x-mcp-profile"
+PROFILE_DIR = os.getenv(
+    "MCP_PROFILE_DIR",
+    os.path.join(os.path.dirname(__file__), "../../logs/profiles"),
+)
+PROFILE_SAMPLE_RATE = float(os.getenv("MCP_PROFILE_SAMPLE_RATE", "0"))
+# Let clients request a profile with X-MCP-Profile (off: anyone could trigger one)
+PROFILE_HEADER_ENABLED = os.getenv("MCP_PROFILE_HEADER", "0").lower() in ("1", "true", "yes")
+PROFILE_KEEP = int(os.getenv("MCP_PROFILE_KEEP", "100"))
+PROFILE_INTERVAL = float(os.getenv("MCP_PROFILE_INTERVAL_MS", "5")) / 1000.0
+SLOW_REQUEST_SECONDS = float(os.getenv("MCP_SLOW_REQUEST_MS", "1000")) / 1000.0
+
+slow_requests: deque = deque(maxlen=int(os.getenv("MCP_SLOW_REQUEST_HISTORY", "50")))
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("mcp_trace", default=None)
+
+
+# =====================================================================
+# STACK SAMPLER
+# =====================================================================
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack every `interval` seconds as timestamped folded stacks."""
+
+    def __init__(self, thread_id: int, interval: float, history: int = 100_000):
+        super().__init__(name="mcp-stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: deque = deque(maxlen=history)  # (perf_counter, folded stack)
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                self.samples.append((time.perf_counter(), ";".join(reversed(names))))
+
+    def window(self, start: float, end: float) -> Counter:
+        """Folded stacks sampled between two perf_counter() times."""
+        return Counter(stack for t, stack in list(self.samples) if start <= t <= end)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+_sampler: Optional[StackSampler] = None
+_sampler_users = 0
+_sampler_lock = threading.Lock()
+
+
+def _acquire_sampler() -> StackSampler:
+    """Shared sampler for the calling (event-loop) thread, started on first use."""
+    global _sampler, _sampler_users
+    with _sampler_lock:
+        _sampler_users += 1
+        if _sampler is None:
+            _sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL)
+            _sampler.start()
+        return _sampler
+
+
+def _release_sampler() -> None:
+    """Stops (joins) the sampler once no profiled request needs it — call off the event loop."""
+    global _sampler, _sampler_users
+    with _sampler_lock:
+        _sampler_users -= 1
+        if _sampler_users or _sampler is None:
+            return
+        sampler, _sampler = _sampler, None
+    sampler.stop()
+
+
+# =====================================================================
+# TRACE
+# =====================================================================
+
+class Trace:
+    def __init__(self, name: str, profile: bool = False):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self._task_ids: Dict[int, int] = {}
+        self.sampler: Optional[StackSampler] = _acquire_sampler() if profile else None
+
+    def _tid(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        return self._task_ids.setdefault(id(task), len(self._task_ids) + 1)
+
+    def add_span(self, name: str, start: float, end: float, args: Dict[str, Any]) -> None:
+        self.spans.append({
+            "name": name,
+            "start_ms": round((start - self.start) * 1000, 3),
+            "duration_ms": round((end - start) * 1000, 3),
+            "tid": self._tid(),
+            "args": args,
+        })
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self.start
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "profiled": self.sampler is not None,
+            "spans": [
+                {k: v for k, v in s.items() if k != "tid"}
+                for s in sorted(self.spans, key=lambda s: s["start_ms"])
+            ],
+        }
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        events = [{
+            "name": self.name, "ph": "X", "pid": 1, "tid": 0,
+            "ts": 0, "dur": round((self.duration or 0) * 1e6, 1),
+        }]
+        for s in self.spans:
+            events.append({
+                "name": s["name"], "ph": "X", "pid": 1, "tid": s["tid"],
+                "ts": round(s["start_ms"] * 1000, 1), "dur": round(s["duration_ms"] * 1000, 1),
+                "args": s["args"],
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_files(self) -> List[str]:
+        """Releases the shared sampler (may join its thread) — call off the event loop."""
+        stacks: Counter = Counter()
+        if self.sampler:
+            stacks = self.sampler.window(self.start, self.start + (self.duration or 0))
+            _release_sampler()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, f"{int(self.started_at)}-{self.id}")
+        paths = [base + ".trace.json"]
+        with open(paths[0], "w", encoding="utf-8") as fh:
+            json.dump(self.chrome_trace(), fh)
+        if stacks:
+            paths.append(base + ".folded")
+            with open(paths[1], "w", encoding="utf-8") as fh:
+                for stack, count in stacks.most_common():
+                    fh.write(f"{stack} {count}\n")
+        _prune_profiles()
+        return paths
+
+
+def _prune_profiles() -> None:
+    """Delete all but the newest PROFILE_KEEP profiles in PROFILE_DIR."""
+    traces = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.name.endswith(".trace.json"):
+            try:
+                traces.append((entry.stat().st_mtime, entry.path[:-len(".trace.json")]))
+            except FileNotFoundError:  # pruned by a concurrent writer
+                pass
+    traces.sort()
+    for _, base in traces[:max(0, len(traces) - PROFILE_KEEP)]:
+        for path in (base + ".trace.json", base + ".folded"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# =====================================================================
+# PUBLIC API
+# =====================================================================
+
+def should_profile(headers) -> bool:
+    if PROFILE_HEADER_ENABLED and headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def start_trace(name: str, profile: bool = False) -> Trace:
+    trace = Trace(name, profile=profile)
+    _current.set(trace)
+    return trace
+
+
+async def finish_trace(trace: Trace) -> Optional[List[str]]:
+    """Stop the trace; keep it if slow and write profile files if profiled."""
+    trace.finish()
+    _current.set(None)
+
+    files = None
+    if trace.sampler is not None:
+        files = await asyncio.to_thread(trace.write_files)
+
+    if trace.duration >= SLOW_REQUEST_SECONDS:
+        entry = trace.summary()
+        if files:
+            entry["profile_files"] = files
+        slow_requests.append(entry)
+    return files
+
+
+class TraceMiddleware:
+    """
+    Pure ASGI middleware tracing requests whose path starts with one of
+    `prefixes`; every other request (bulk streams included) passes straight
+    through. Profiled responses carry an X-MCP-Trace-Id header.
+    """
+
+    def __init__(self, app, prefixes):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        profile = should_profile(headers)
+        trace = start_trace(f"{scope['method']} {scope['path']}", profile=profile)
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-mcp-trace-id", trace.id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace_id if profile else send)
+        finally:
+            await finish_trace(trace)
+
+
+@contextmanager
+def span(name: str, **args):
+    """Time a stage of the current request. No-op when nothing is being traced."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(name, start, time.perf_counter(), args)
+
+
+def traced(name: str):
+    """Decorator form of `span` for coroutine functions."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return await fn(*args, **kwargs)
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator